@@ -6,16 +6,20 @@ import joblib
 import pandas as pd
 from pathlib import Path
 import base64
+import functools
 
 # Import all necessary backend functions for all pages
 from recommender_utils import (
-    recommend_books_by_filter_api, 
+    stream_books_by_filter_api,
+    similar_book_ids,
     recommend_similar_books_local, 
     get_trending_books
 )
 from backend.ext_api import lookup_google, get_amazon_result, get_shopping_results
+from backend.book_ids import register_local_books
 from backend.p_chatbot import answer
 from pages import discover, chatbot, journal
+from ui_utils import render_grid, render_paginated_grid, reset_grid
 
 # --- Page Configuration (only here in app.py) ---
 st.set_page_config(page_title="Taurus", layout="wide",initial_sidebar_state="collapsed")
@@ -105,6 +109,101 @@ def load_all_data():
         st.error(f"Error loading local data files: {e}")
     return df_meta, cosine_sim, indices, final_ratings, genre_list
 
+# --- Result Sections ---
+# Each section is an st.fragment: its widgets only rerun the fragment, and the computed
+# results live in session state so paging or re-rendering never repeats the lookups.
+
+def render_book_card(book: dict):
+    display_book_image(book.get("Image-URL"))
+    st.markdown(f"**{book['Book-Title']}**")
+    year = book.get("Published-Year")
+    st.caption(f"By {book['Book-Author']}" + (f" ({year})" if year else ""))
+
+def render_trending_card(book: dict):
+    render_book_card(book)
+    st.markdown(f"**Rating:** {display_star_rating(book['avg_rating'])}")
+    st.caption(f"Based on {int(book['num_ratings'])} user reviews.")
+
+@st.fragment
+def similar_books_section(df_meta, cosine_sim, indices_map):
+    st.subheader("Get recommendations based on a book you like")
+    title_input = st.text_input("Enter a book title (e.g., The Hobbit)")
+    top_n_similar = st.number_input("Number of similar books", 1, 10, 5, key="top_n_similar")
+    if st.button("Find Similar Books", type="primary"):
+        with st.spinner("Finding similar books and fetching fresh details..."):
+            similar_books_df = recommend_similar_books_local(
+                input_title=title_input, df_meta=df_meta, cosine_sim=cosine_sim, indices=indices_map, top_n=top_n_similar
+            )
+        st.session_state.similar_results = {"title": title_input, "books": similar_books_df.to_dict("records")}
+        reset_grid("similar_grid")
+
+    results = st.session_state.get("similar_results")
+    if results is not None:
+        st.divider()
+        if results["books"]:
+            st.subheader(f"Books similar to '{results['title']}':")
+            render_paginated_grid(results["books"], "similar_grid", render_book_card)
+        else:
+            st.warning("Could not find that book or any similar ones. Please try a more specific title.")
+
+@st.fragment
+def filter_books_section():
+    st.subheader("Search for popular books by filter")
+    genre  = st.text_input("Genre", key="genre_filter")
+    author = st.text_input("Author", key="author_filter")
+    year   = st.slider("Publication Year Range", 1800, 2025, (1990, 2020))
+    top_n_filter = st.number_input("Number of results", 1, 10, 5, key="top_n_filter")
+    if st.button("Find Books by Filter"):
+        # Show hits as they stream in, then hand the full list to the paginated grid below
+        books, live_results = [], st.empty()
+        with st.spinner("Searching for books..."):
+            for book in stream_books_by_filter_api(genre=genre, author=author, year_range=year, top_n=top_n_filter):
+                books.append(book)
+                with live_results.container():
+                    st.caption(f"Found {len(books)} of {top_n_filter}...")
+                    render_grid(books, render_book_card)
+        live_results.empty()
+        st.session_state.filter_results = books
+        reset_grid("filter_grid")
+
+    results = st.session_state.get("filter_results")
+    if results is not None:
+        st.divider()
+        if results:
+            st.subheader("API Search Results:")
+            render_paginated_grid(results, "filter_grid", render_book_card)
+        else:
+            st.warning("No books found for this combination via the API.")
+
+@st.fragment
+def trending_section(df_meta, final_ratings, genre_list):
+    st.write("Discover the highest-rated books in your favorite genres based on user reviews.")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected_genre = st.selectbox("Select a Genre", genre_list, key="genre_select")
+    with col2:
+        top_n_trending = st.number_input("Show Top", 1, 10, 3, key="top_n_trending")
+
+    if not selected_genre: return
+    # Only recompute when the genre or count actually changes
+    query = (selected_genre, top_n_trending)
+    if st.session_state.get("trending_query") != query:
+        with st.spinner(f"Finding trending books in {selected_genre}..."):
+            trending_books = get_trending_books(
+                genre=selected_genre, df_meta=df_meta, final_ratings=final_ratings, top_n=top_n_trending
+            )
+        st.session_state.trending_query = query
+        st.session_state.trending_results = trending_books.to_dict("records")
+        reset_grid("trending_grid")
+
+    results = st.session_state.trending_results
+    st.divider()
+    if results:
+        st.subheader(f"Top {len(results)} Trending Books in {selected_genre}")
+        render_paginated_grid(results, "trending_grid", render_trending_card)
+    else:
+        st.warning(f"No trending books with enough ratings found for '{selected_genre}'.")
+
 # --- Main App Logic ---
 
 # Landing Page
@@ -172,6 +271,8 @@ if not st.session_state.app_started:
 
 else: 
     df_meta, cosine_sim, indices_map, final_ratings, genre_list = load_all_data()
+    if df_meta is not None:
+        register_local_books(df_meta) # Map local rows onto canonical book ids (once per process)
     
     # Restored styled text title
     st.markdown("""
@@ -198,90 +299,16 @@ else:
         else:
             tab1, tab2 = st.tabs(["Find Similar Books (using Local Data)", "Find Books by Filter (using Live API)"])
             with tab1:
-                st.subheader("Get recommendations based on a book you like")
-                title_input = st.text_input("Enter a book title (e.g., The Hobbit)")
-                top_n_similar = st.number_input("Number of similar books", 1, 10, 5, key="top_n_similar")
-                if st.button("Find Similar Books", type="primary"):
-                    with st.spinner("Finding similar books and fetching fresh details..."):
-                        similar_books_df = recommend_similar_books_local(
-                            input_title=title_input, df_meta=df_meta, cosine_sim=cosine_sim, indices=indices_map, top_n=top_n_similar
-                        )
-                    st.divider()
-                    if not similar_books_df.empty:
-                        st.subheader(f"Books similar to '{title_input}':")
-                        for index, row in similar_books_df.iterrows():
-                            col1, col2 = st.columns([1, 4])
-                            with col1:
-                                display_book_image(row.get("Image-URL"))
-                            with col2:
-                                st.subheader(row["Book-Title"])
-                                st.caption(f"By {row['Book-Author']}")
-                    else:
-                        st.warning("Could not find that book or any similar ones. Please try a more specific title.")
+                similar_books_section(df_meta, cosine_sim, indices_map)
             with tab2:
-                st.subheader("Search for popular books by filter")
-                genre  = st.text_input("Genre", key="genre_filter")
-                author = st.text_input("Author", key="author_filter")
-                year   = st.slider("Publication Year Range", 1800, 2025, (1990, 2020))
-                top_n_filter = st.number_input("Number of results", 1, 10, 5, key="top_n_filter")
-                if st.button("Find Books by Filter"):
-                    with st.spinner("Searching for books..."):
-                        results_df = recommend_books_by_filter_api(genre=genre, author=author, year_range=year, top_n=top_n_filter)
-                    st.divider()
-                    if not results_df.empty:
-                        st.subheader("API Search Results:")
-                        for index, row in results_df.iterrows():
-                            col1, col2 = st.columns([1, 4])
-                            with col1:
-                                display_book_image(row.get("Image-URL"))
-                            with col2:
-                                st.subheader(row["Book-Title"])
-                                st.caption(f"By {row['Book-Author']} ({row.get('Published-Year', '')})")
-                    else:
-                        st.warning("No books found for this combination via the API.")
-
-    # In app.py, replace the whole "Trending" section
+                filter_books_section()
 
     elif st.session_state.page == "Trending":
         st.header("🔥 Trending Books by Genre")
         if final_ratings is None:
             st.error("Trending Data Not Available. This feature requires the `final_ratings.pkl` file.")
         else:
-            st.write("Discover the highest-rated books in your favorite genres based on user reviews.")
-        
-        # --- INPUT WIDGETS ---
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                selected_genre = st.selectbox("Select a Genre", genre_list, key="genre_select")
-            with col2:
-                top_n_trending = st.number_input("Show Top", 1, 10, 3, key="top_n_trending")
-
-        # **FIX**: The second, duplicate st.selectbox was removed from here.
-        
-        # The logic now runs automatically if a genre is selected.
-            if selected_genre:
-                with st.spinner(f"Finding trending books in {selected_genre}..."):
-                    trending_books = get_trending_books(
-                    genre=selected_genre, 
-                    df_meta=df_meta, 
-                    final_ratings=final_ratings, 
-                    top_n=top_n_trending # **FIX**: Now uses the value from the number input
-                )
-                st.divider()
-                if not trending_books.empty:
-                    st.subheader(f"Top {len(trending_books)} Trending Books in {selected_genre}")
-                    for index, row in trending_books.iterrows():
-                        col1_disp, col2_disp = st.columns([1, 3])
-                        with col1_disp:
-                            display_book_image(row.get("Image-URL"))
-                        with col2_disp:
-                            st.subheader(row["Book-Title"])
-                            st.caption(f"By {row['Book-Author']}")
-                            st.markdown(f"**Rating:** {display_star_rating(row['avg_rating'])}")
-                            st.caption(f"Based on {int(row['num_ratings'])} user reviews.")
-                        st.write("---")
-                else:
-                    st.warning(f"No trending books with enough ratings found for '{selected_genre}'.")
+            trending_section(df_meta, final_ratings, genre_list)
 
     elif st.session_state.page == "Discover":
         # This now correctly calls your discover.py file
@@ -289,8 +316,11 @@ else:
 
     elif st.session_state.page == "Chatbot":
         # This now correctly calls your chatbot.py file
-        chatbot.render_page()
+        similar_books = None
+        if df_meta is not None:
+            similar_books = functools.partial(similar_book_ids, df_meta=df_meta, cosine_sim=cosine_sim, indices=indices_map)
+        chatbot.render_page({"similar_books": similar_books})
 
     elif st.session_state.page == "Journal":
         # This now correctly calls your journal.py file
-        journal.render_page()
\ No newline at end of file
+        journal.render_page()
@@ -0,0 +1,186 @@
+import re
+import threading
+import requests
+
+# --- Canonical book entities ---
+# Every book (the work, not one edition) gets one id: the ISBN-13 ("isbn:..."), Google volume id
+# ("gid:...") or title+author ("title:...") of the first edition we saw. Each edition's ISBN and
+# volume id is kept as an alias of that id, and editions merge on their title+author alias as long
+# as the first authors agree. Bare title spellings are kept in a separate index used only to look
+# up free-text titles, never to merge records.
+
+GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+TIMEOUT = 30
+
+_lock = threading.Lock()
+_books = {}        # canonical id -> book record
+_aliases = {}      # identity alias ("isbn:", "gid:", "title:") -> canonical id
+_title_index = {}  # normalized title (optionally "|surname") -> canonical id, for lookups only
+_misses = set()    # lookup keys/ids Google had no match for
+_local_books_registered = False
+
+
+def normalize_title(title) -> str:
+    """Reduces a title to a spelling-insensitive key (no edition notes, leading article or punctuation)."""
+    title = re.split(r"[\(\[]", str(title or "").lower())[0]   # "(Harry Potter, Book 1)", "[Paperback]"
+    title = re.sub(r"[^\w\s]", "", title)
+    title = re.sub(r"^(the|a|an)\s+", "", title.strip())
+    return " ".join(title.split())
+
+def normalize_isbn(isbn) -> str | None:
+    """Returns the ISBN-13 form of an ISBN-10/13, or None if it isn't one."""
+    digits = re.sub(r"[^0-9X]", "", str(isbn or "").upper())
+    if len(digits) == 10:
+        if not digits[:9].isdigit() or not (digits[9].isdigit() or digits[9] == "X"):
+            return None   # "X" is only valid as the check digit
+        core = "978" + digits[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(core)) % 10) % 10
+        return core + str(check)
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    return None
+
+def _author_key(author) -> str:
+    first_author = str(author or "").split(",")[0].strip()
+    return first_author.split()[-1].lower().strip(".") if first_author else ""
+
+def _lookup_keys(title, author=None) -> list:
+    norm = normalize_title(title)
+    if not norm: return []
+    surname = _author_key(author)
+    return ([f"{norm}|{surname}"] if surname else []) + [norm]
+
+def _identity_aliases(record: dict) -> list:
+    aliases = []
+    if record.get("isbn"): aliases.append(f"isbn:{record['isbn']}")
+    if record.get("volume_id"): aliases.append(f"gid:{record['volume_id']}")
+    keys = _lookup_keys(record.get("title"), record.get("authors"))
+    if keys: aliases.append(f"title:{keys[0]}")
+    return aliases
+
+def _conflicts(book: dict, record: dict) -> bool:
+    """True if two records name different first authors (different ISBNs are just other editions)."""
+    authors = _author_key(book.get("authors")), _author_key(record.get("authors"))
+    return bool(authors[0] and authors[1] and authors[0] != authors[1])
+
+def _register(record: dict, book_id: str | None = None) -> str | None:
+    """Merges `record` into `book_id`, or into the entity one of its identity aliases points to (or a new one)."""
+    aliases = _identity_aliases(record)
+    if not aliases and book_id is None: return None
+    with _lock:
+        if book_id is None:
+            book_id = next((_aliases[a] for a in aliases if not a.startswith("title:") and a in _aliases), None)
+        if book_id is None:
+            title_id = _aliases.get(aliases[-1]) if aliases[-1].startswith("title:") else None
+            if title_id is not None and not _conflicts(_books[title_id], record):
+                book_id = title_id
+        if book_id is None:
+            book_id = aliases[0]
+
+        book = _books.setdefault(book_id, {"id": book_id})
+        for key, value in record.items():
+            if value and not book.get(key):
+                book[key] = value
+        for alias in aliases:
+            _aliases.setdefault(alias, book_id)
+        for key in _lookup_keys(record.get("title"), record.get("authors")):
+            _title_index.setdefault(key, book_id)
+    return book_id
+
+def _volume_record(item: dict) -> dict:
+    info = item.get("volumeInfo", {})
+    identifiers = {i.get("type"): i.get("identifier") for i in info.get("industryIdentifiers", [])}
+    return {
+        "title": info.get("title"),
+        "authors": ", ".join(info.get("authors", [])),
+        "published_year": info.get("publishedDate", "")[:4],
+        "thumbnail": info.get("imageLinks", {}).get("thumbnail"),
+        "description": info.get("description"),
+        "isbn": normalize_isbn(identifiers.get("ISBN_13") or identifiers.get("ISBN_10")),
+        "volume_id": item.get("id"),
+    }
+
+def resolve_volume(item: dict) -> str | None:
+    """Registers a Google Books volume (an item from the `volumes` API) and returns its canonical id."""
+    return _register(_volume_record(item))
+
+def book_id_for_row(row) -> str | None:
+    """Registers a local `df_meta`/ratings row (by ISBN when present) and returns its canonical id."""
+    return _register({
+        "title": row.get("Book-Title"), "authors": row.get("Book-Author"), "isbn": normalize_isbn(row.get("ISBN"))
+    })
+
+def register_local_books(df_meta) -> None:
+    """
+    Maps every `df_meta` row onto a canonical id, so later title lookups resolve without an API call.
+    Runs once per process; later calls are no-ops.
+    """
+    global _local_books_registered
+    with _lock:
+        if _local_books_registered: return
+        _local_books_registered = True
+    for row in df_meta.to_dict("records"):
+        book_id_for_row(row)
+
+def _search_volume(query: str, timeout: float = TIMEOUT) -> dict | None:
+    params = {"q": query, "maxResults": 1, "printType": "books", "langRestrict": "en"}
+    response = requests.get(GOOGLE_BOOKS_API_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    items = response.json().get("items", [])
+    return items[0] if items else None
+
+def resolve_title(title: str, author: str | None = None, timeout: float = TIMEOUT) -> str | None:
+    """
+    Returns the canonical id for a free-text title (and optional author). Known spellings resolve
+    locally; otherwise Google Books is searched once and the result is remembered under this spelling.
+    """
+    keys = _lookup_keys(title, author)
+    if not keys: return None
+    with _lock:
+        known = next((_title_index[k] for k in keys if k in _title_index), None)
+        if known or keys[0] in _misses:
+            return known
+
+    query = f'intitle:"{title.strip()}"' + (f' inauthor:"{author.strip()}"' if author else "")
+    try:
+        item = _search_volume(query, timeout)
+    except Exception as e:
+        print(f"API request failed for '{title}': {e}")
+        return None
+    if item is None:
+        with _lock: _misses.add(keys[0])
+        return None
+
+    book_id = resolve_volume(item)
+    with _lock:
+        for key in keys:
+            _title_index.setdefault(key, book_id)   # Remember this spelling for later lookups
+    return book_id
+
+def get_book(book_id: str | None, fetch_details: bool = True, timeout: float = TIMEOUT) -> dict | None:
+    """
+    Returns a copy of the canonical record for `book_id`. Records only known locally (e.g. from
+    `df_meta`) are filled in from Google Books (by ISBN when we have one) the first time they're asked for,
+    unless `fetch_details` is False.
+    """
+    with _lock:
+        book = _books.get(book_id)
+        needs_details = fetch_details and book is not None and not book.get("volume_id") and book_id not in _misses
+    if book is None: return None
+
+    if needs_details:
+        if book.get("isbn"):
+            query = f"isbn:{book['isbn']}"
+        else:
+            query = f'intitle:"{book["title"]}"' + (f' inauthor:"{book["authors"]}"' if book.get("authors") else "")
+        try:
+            item = _search_volume(query, timeout)
+            record = _volume_record(item) if item is not None else None
+            if record is None or _conflicts(book, record):
+                with _lock: _misses.add(book_id)   # No match, or Google's best match is a different book
+            else:
+                _register(record, book_id)
+        except Exception as e:
+            print(f"API request failed for '{book['title']}': {e}")
+    with _lock:
+        return dict(_books[book_id])
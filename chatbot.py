@@ -1,9 +1,14 @@
 # pages/chatbot.py
 
 import streamlit as st
-from backend.p_chatbot import answer # Corrected import
+from backend.p_chatbot import stream_answer, PART_SEPARATOR # Corrected import
 
-def render_page():
+def _with_separators(parts):
+    for i, part in enumerate(parts):
+        yield part if i == 0 else PART_SEPARATOR + part
+
+def render_page(context: dict | None = None):
+    """`context` carries local resources for the bot, e.g. `similar_books` for "books like X" answers."""
     st.header("Book-Bot")
 
     if "messages" not in st.session_state:
@@ -13,14 +18,14 @@ def render_page():
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
-    if prompt := st.chat_input("Ask me: e.g. Define 'ephemeral', or Plot of '1984'"):
+    if prompt := st.chat_input("Ask me: e.g. Define 'ephemeral' and Plot of '1984', or Books like 'The Hobbit'"):
         st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        with st.spinner("Thinking..."):
-            reply = answer(prompt)
+        # Each part of the reply appears as soon as its lookup finishes
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                reply = st.write_stream(_with_separators(stream_answer(prompt, context)))
         
         st.session_state.messages.append({"role": "assistant", "content": reply})
-        with st.chat_message("assistant"):
-            st.markdown(reply)
\ No newline at end of file
@@ -2,35 +2,56 @@
 
 import streamlit as st
 from backend.ext_api import lookup_google, get_shopping_results, get_amazon_result
+from ui_utils import render_paginated_grid, reset_grid
+
+def _select_book(book):
+    st.session_state.selected_book_discover = book # Use a unique session state key
+    # A (repeat) click always looks prices up again; successful lookups are cached in ext_api
+    st.session_state.pop("discover_prices", None)
+
+def _render_search_card(book):
+    if book.get("thumbnail"): st.image(book["thumbnail"])
+    st.caption(book["title"])
+    st.button("Find Prices", key=f"book_{book['id']}", help=f"Find prices for {book['title']}",
+              on_click=_select_book, args=(book,))
 
 def render_page():
     st.header(" Discover & Compare Prices")
     st.write("Search for a book, select the correct edition, and see where you can buy it online.")
-    
+    discover_section()
+
+@st.fragment
+def discover_section():
     search_query = st.text_input("Enter a book title to search:", placeholder="e.g., The Alchemist")
 
     if search_query:
-        st.divider()
-        with st.spinner("Searching Google Books..."):
-            google_results = lookup_google(search_query)
+        # The search step only runs when the query changes, not on every "Find Prices" click
+        if st.session_state.get("discover_query") != search_query:
+            with st.spinner("Searching Google Books..."):
+                st.session_state.discover_results = lookup_google(search_query, max_results=10)
+            st.session_state.discover_query = search_query
+            reset_grid("discover_grid")
 
+        st.divider()
+        google_results = st.session_state.discover_results
         if not google_results:
             st.error("Could not find any books matching that query on Google Books. Please try again.")
         else:
             st.subheader("Step 1: Choose the correct book from the list")
-            cols = st.columns(min(len(google_results), 5))
-            for i, book in enumerate(google_results[:5]):
-                with cols[i]:
-                    if book.get("thumbnail"): st.image(book["thumbnail"])
-                    st.caption(book["title"])
-                    if st.button("Find Prices", key=f"book_{i}", help=f"Find prices for {book['title']}"):
-                        st.session_state.selected_book_discover = book # Use a unique session state key
+            render_paginated_grid(google_results, "discover_grid", _render_search_card, per_page=5, n_cols=5)
     
     if 'selected_book_discover' in st.session_state:
         selected = st.session_state.selected_book_discover
-        with st.spinner(f"Searching online stores for '{selected['title']}'..."):
-            amazon_result = get_amazon_result(selected['title'])
-            shopping_results = get_shopping_results(selected['title'])
+        prices = st.session_state.get("discover_prices")
+        if prices is None or prices["book_id"] != selected['id']:
+            with st.spinner(f"Searching online stores for '{selected['title']}'..."):
+                prices = {
+                    "book_id": selected['id'],
+                    "amazon": get_amazon_result(selected['id']),
+                    "shopping": get_shopping_results(selected['id']),
+                }
+            st.session_state.discover_prices = prices
+        amazon_result, shopping_results = prices["amazon"], prices["shopping"]
         
         st.divider()
         st.subheader(f"Step 2: Buying options for '{selected['title']}'")
@@ -49,4 +70,4 @@ def render_page():
             for item in shopping_results:
                 if "amazon" in item['seller'].lower():
                     continue
-                st.write(f"**{item['seller']}**: {item['price']} - [{item['title']}]({item['link']})")
\ No newline at end of file
+                st.write(f"**{item['seller']}**: {item['price']} - [{item['title']}]({item['link']})")
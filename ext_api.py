@@ -1,27 +1,35 @@
 import os
+import time
 import functools
+import threading
 from dotenv import load_dotenv
 from serpapi import SerpApiClient
 import requests
 from urllib.parse import urlparse, parse_qs, unquote
+from backend.book_ids import get_book, resolve_volume
 
 load_dotenv()
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
-GOOGLE_API = "https://www.googleapis.com/books/v1/volumes?q="
+GOOGLE_API = "https://www.googleapis.com/books/v1/volumes"
 TIMEOUT = 90
+PRICE_CACHE_TTL = 6 * 60 * 60   # seconds a successful price lookup is reused
 
 @functools.lru_cache(maxsize=1024)
 def lookup_google(book_query, max_results=5):
-    """Fetches book data from the Google Books API."""
-    url = f"{GOOGLE_API}{book_query}&maxResults={max_results}&printType=books"
+    """Fetches book data from the Google Books API, one entry per canonical book id."""
+    params = {"q": book_query, "maxResults": max_results, "printType": "books"}
     try:
-        response = requests.get(url, timeout=TIMEOUT)
+        response = requests.get(GOOGLE_API, params=params, timeout=TIMEOUT)
         response.raise_for_status()
         data = response.json()
-        books = []
+        books, seen_ids = [], set()
         for item in data.get("items", []):
+            book_id = resolve_volume(item)
+            if book_id is None or book_id in seen_ids: continue
+            seen_ids.add(book_id)
             info = item.get("volumeInfo", {})
             books.append({
+                "id": book_id,
                 "title": info.get("title", "Unknown Title"),
                 "authors": ", ".join(info.get("authors", ["Unknown Author"])),
                 "thumbnail": info.get("imageLinks", {}).get("thumbnail", ""),
@@ -31,12 +39,47 @@ def lookup_google(book_query, max_results=5):
         print(f" Google API Error: {e}")
         return []
 
-def get_shopping_results(book_title):
-    """Gets Google Shopping results and processes them into a clean, consistent format."""
+def _cache_successes(maxsize=256, ttl=PRICE_CACHE_TTL):
+    """
+    Memoizes a one-argument lookup for `ttl` seconds, but only when it returned something,
+    so a missing key or a network error is retried on the next call instead of being cached.
+    """
+    def decorator(func):
+        cache, lock = {}, threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(key):
+            with lock:
+                hit = cache.get(key)
+                if hit and time.monotonic() - hit[0] < ttl:
+                    return hit[1]
+            result = func(key)
+            if result:
+                with lock:
+                    cache.pop(key, None)
+                    cache[key] = (time.monotonic(), result)
+                    while len(cache) > maxsize:
+                        cache.pop(next(iter(cache)))   # Oldest entry first
+            return result
+        return wrapper
+    return decorator
+
+def _listing_query(book_id):
+    """Builds a store search query for a canonical book (title plus author, so editions match)."""
+    book = get_book(book_id)
+    if book is None: return None
+    author = (book.get("authors") or "").split(",")[0]
+    return f"{book['title']} {author}".strip()
+
+@_cache_successes()
+def get_shopping_results(book_id):
+    """Gets Google Shopping results for a canonical book id and processes them into a clean, consistent format."""
     if not SERPAPI_API_KEY: return []
+    book_query = _listing_query(book_id)
+    if not book_query: return []
     params = {
         "api_key": SERPAPI_API_KEY, "engine": "google_shopping",
-        "q": f"{book_title} book", "google_domain": "google.co.in",
+        "q": f"{book_query} book", "google_domain": "google.co.in",
         "gl": "in", "hl": "en"
     }
     try:
@@ -54,7 +97,8 @@ def get_shopping_results(book_title):
                 "title": item.get("title", "N/A"),
                 "price": item.get("price", "N/A"),
                 "seller": item.get("source", "N/A"), # Map 'source' to our 'seller' key
-                "link": final_link
+                "link": final_link,
+                "book_id": book_id
             })
         print(f"✅ Found and processed {len(final_results)} results from Google Shopping.")
         return final_results
@@ -62,13 +106,16 @@ def get_shopping_results(book_title):
         print(f" Google Shopping Scraper Error: {e}")
         return []
 
-def get_amazon_result(book_title):
-    """Uses Google's standard search with a 'site:amazon.in' filter."""
-    if not SERPAPI_API_KEY: return []
+@_cache_successes()
+def get_amazon_result(book_id):
+    """Uses Google's standard search with a 'site:amazon.in' filter, for a canonical book id."""
+    if not SERPAPI_API_KEY: return None
+    book_query = _listing_query(book_id)
+    if not book_query: return None
     params = {
         "api_key": SERPAPI_API_KEY,
         "engine": "google",
-        "q": f"site:amazon.in {book_title} book",
+        "q": f"site:amazon.in {book_query} book",
         "gl": "in", "hl": "en"
     }
     try:
@@ -83,10 +130,11 @@ def get_amazon_result(book_title):
         result = {
             "title": top_result.get("title", "N/A"),
             "price": price or "See site",
-            "link": top_result.get("link", "#")
+            "link": top_result.get("link", "#"),
+            "book_id": book_id
         }
         print("✅ Found an Amazon result via Google site search.")
         return result
     except Exception as e:
         print(f"Amazon (via Google) Search Error: {e}")
-        return None
\ No newline at end of file
+        return None
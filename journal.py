@@ -5,9 +5,13 @@ import pandas as pd
 import datetime as dt
 import sqlite3
 from pathlib import Path
+from ui_utils import render_paginated_grid, reset_grid
+from backend.book_ids import resolve_title
 
 DB_PATH = Path(__file__).resolve().parent.parent / "db/journal.db"
 DB_PATH.parent.mkdir(exist_ok=True, parents=True)
+RESOLVE_TIMEOUT = 3      # seconds per book id lookup, so saving never hangs on Google Books
+RESOLVE_BATCH = 5        # unlinked entries backfilled per load
 
 def get_conn():
     return sqlite3.connect(DB_PATH, check_same_thread=False)
@@ -17,14 +21,41 @@ def init_db():
         conn.execute(
             """CREATE TABLE IF NOT EXISTS journal_entries (
                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, book TEXT,
-                   rating REAL, summary TEXT, date_written TEXT
+                   rating REAL, summary TEXT, date_written TEXT, book_id TEXT
                )"""
         )
+        # Journals created before entries were linked to canonical book ids
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(journal_entries)")]
+        if "book_id" not in columns:
+            conn.execute("ALTER TABLE journal_entries ADD COLUMN book_id TEXT")
 init_db()
 
+def backfill_book_ids(limit: int = RESOLVE_BATCH):
+    """Links a few entries saved without a canonical book id (new, or whose lookup failed before)."""
+    with get_conn() as conn:
+        rows = conn.execute("SELECT id, book FROM journal_entries WHERE book_id IS NULL ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    for entry_id, book in rows:
+        book_id = resolve_title(book, timeout=RESOLVE_TIMEOUT)
+        if book_id:
+            with get_conn() as conn:
+                conn.execute("UPDATE journal_entries SET book_id = ? WHERE id = ?", (book_id, entry_id))
+
+def load_entries() -> list:
+    backfill_book_ids()
+    with get_conn() as conn:
+        df = pd.read_sql_query("SELECT * FROM journal_entries ORDER BY date_written DESC", conn)
+    return df.to_dict("records")
+
+def _render_entry(row):
+    with st.expander(f"{row['book']}  |  ⭐ {row['rating']}  |  {row['date_written']}"):
+        st.write(row["summary"] or "*(no summary)*")
+
 def render_page():
     st.header("My Reading Journal")
+    journal_section()
 
+@st.fragment
+def journal_section():
     with st.form("new_entry"):
         st.subheader("New entry")
         col1, col2 = st.columns(2)
@@ -45,16 +76,18 @@ def render_page():
                         "INSERT INTO journal_entries (user_id, book, rating, summary, date_written) VALUES (?, ?, ?, ?, ?)",
                         (user_id, book.strip(), rating, summary.strip(), dt.datetime.now().isoformat(timespec="seconds"))
                     )
+                # Reload the entries list on this run only; that also links the new entry to its book id
+                st.session_state.pop("journal_entries", None)
                 st.success("Entry saved!")
     
     st.divider()
     st.subheader("Past entries")
-    with get_conn() as conn:
-        df = pd.read_sql_query("SELECT * FROM journal_entries ORDER BY date_written DESC", conn)
+    if "journal_entries" not in st.session_state:
+        st.session_state.journal_entries = load_entries()
+        reset_grid("journal_grid")
 
-    if df.empty:
+    entries = st.session_state.journal_entries
+    if not entries:
         st.info("No journal entries yet.")
     else:
-        for _, row in df.iterrows():
-            with st.expander(f"{row['book']}  |  ⭐ {row['rating']}  |  {row['date_written']}"):
-                st.write(row["summary"] or "*(no summary)*")
\ No newline at end of file
+        render_paginated_grid(entries, "journal_grid", _render_entry, per_page=10, n_cols=1)
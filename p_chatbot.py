@@ -1,9 +1,16 @@
 import requests
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from backend.book_ids import get_book, resolve_title
 
 # --- API Endpoints ---
 DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
-GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+
+REPLY_TIME_BUDGET = 12   # seconds a reply waits for all of its parts
+TIMEOUT = 5              # per HTTP call; a handler makes at most two, so it finishes within the budget
+MAX_PROMPT_LENGTH = 500
+MAX_INTENTS = 4          # intents answered per message
+PART_SEPARATOR = "\n\n---\n\n"
 
 
 def get_definition(word: str) -> str:
@@ -11,7 +18,7 @@ def get_definition(word: str) -> str:
     Fetches comprehensive definitions of a word and formats them.
     """
     try:
-        response = requests.get(f"{DICTIONARY_API_URL}{word}")
+        response = requests.get(f"{DICTIONARY_API_URL}{word}", timeout=TIMEOUT)
         response.raise_for_status()
         
         data = response.json()[0]
@@ -39,21 +46,16 @@ def get_definition(word: str) -> str:
 
 def get_book_info(book_title: str) -> str:
     """
-    Fetches the description (plot summary) of a book from the Google Books API.
+    Fetches the description (plot summary) of a book, resolved through the canonical book store.
     """
-    params = {"q": f"intitle:{book_title}", "maxResults": 1}
     try:
-        response = requests.get(GOOGLE_BOOKS_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if "items" not in data or not data["items"]:
+        book = get_book(resolve_title(book_title, timeout=TIMEOUT), timeout=TIMEOUT)
+        if book is None:
             return f"Sorry, I couldn't find any information for the book '{book_title}'."
-            
-        book_info = data["items"][0]["volumeInfo"]
-        title = book_info.get("title", "N/A")
-        authors = ", ".join(book_info.get("authors", ["Unknown"]))
-        description = book_info.get("description", "No plot summary available.")
+
+        title = book.get("title") or "N/A"
+        authors = book.get("authors") or "Unknown"
+        description = book.get("description") or "No plot summary available."
 
         return f"**{title}** by {authors}\n\n**Plot Summary:**\n{description}"
 
@@ -62,37 +64,135 @@ def get_book_info(book_title: str) -> str:
         return "An unexpected error occurred while fetching book information."
 
 
-def answer(prompt: str) -> str:
+# --- Intent Routing ---
+# Each intent registers its trigger phrases once (compiled here, not per message) and a
+# `handler(subject, context)`. A message is split into clauses only where a conjunction or
+# sentence break is followed by another trigger ("define X and plot of Y"), so trigger words
+# inside a title ("Summary of What is the What") don't split it. Each clause answers one intent.
+
+INTENTS = []   # (name, compiled trigger pattern, handler), in registration order
+_TRIGGERS = []
+_CLAUSE_BREAK = None
+_CONNECTORS = {"and", "or", "also", "then", "plus", "&"}
+_JUNK_CHARS = " \t\n'\"?.!,;"
+
+def intent(name: str, *triggers: str):
+    """Registers the decorated handler for messages containing any of `triggers` (longest first)."""
+    global _CLAUSE_BREAK
+    phrases = "|".join(re.escape(t) for t in triggers)
+    pattern = re.compile(r"\b(?:" + phrases + r")\s+", re.IGNORECASE)
+    _TRIGGERS.extend(re.escape(t) for t in triggers)
+    _CLAUSE_BREAK = re.compile(
+        r"(?:\s*(?:[.?!;,&]|\b(?:and|or|also|then|plus)\b))+\s*(?=\b(?:" + "|".join(_TRIGGERS) + r")\s)", re.IGNORECASE
+    )
+    def register(handler):
+        INTENTS.append((name, pattern, handler))
+        return handler
+    return register
+
+def _clean_subject(text: str) -> str:
+    """Drops trailing punctuation and dangling connectors ("... and", "... also?") from a subject."""
+    words = text.split()
+    while words and (not words[-1].strip(_JUNK_CHARS) or words[-1].strip(_JUNK_CHARS).lower() in _CONNECTORS):
+        words.pop()
+    return " ".join(words).strip(_JUNK_CHARS)
+
+def _first_trigger(clause: str):
+    """Returns (name, handler, end of trigger) for the earliest trigger in `clause`; the longest wins ties."""
+    best = None
+    for name, pattern, handler in INTENTS:
+        match = pattern.search(clause)
+        if match and (best is None or (match.start(), -match.end()) < (best[0].start(), -best[0].end())):
+            best = (match, name, handler)
+    return (best[1], best[2], best[0].end()) if best else None
+
+def route(prompt: str) -> list:
     """
-    **NEW and IMPROVED**
-    Uses regular expressions to flexibly understand user intent and extract keywords,
-    ignoring punctuation.
+    Splits a message into (intent name, handler, subject) triples, in the order they appear, e.g.
+    "Define 'ephemeral', or Plot of '1984'" -> define "ephemeral", then plot "1984".
     """
-    prompt_lower = prompt.lower().strip()
-
-    # --- Regex Patterns to understand different ways of asking ---
-    # It looks for trigger words and then captures the subject of the question.
-    define_pattern = r"(?:what is|what's|what is the meaning of|define|meaning of)\s+['\"]?([\w\s-]+)['\"]?"
-    plot_pattern = r"(?:plot of|summary of|what is the plot of|what's the plot of)\s+['\"]?(.+?)['\"]?"
-
-    # --- Match against patterns ---
-    define_match = re.search(define_pattern, prompt_lower)
-    plot_match = re.search(plot_pattern, prompt_lower)
-
-    if define_match:
-        word = define_match.group(1).strip().rstrip('?.!')
-        if word:
-            return get_definition(word)
-
-    if plot_match:
-        title = plot_match.group(1).strip().rstrip('?.!')
-        if title:
-            return get_book_info(title)
-        
-    # --- Default Case ---
-    return (
-        "I can help with a couple of things:\n\n"
-        "1.  **Definitions:** Try asking `What is melancholy?`\n"
-        "2.  **Book Plots:** Try asking `Plot of The Great Gatsby`\n\n"
-        "How can I assist you?"
-    )
\ No newline at end of file
+    routes = []
+    for clause in _CLAUSE_BREAK.split(prompt[:MAX_PROMPT_LENGTH]):
+        match = _first_trigger(clause)
+        if match is None: continue
+        name, handler, end = match
+        subject = _clean_subject(clause[end:])
+        if subject:
+            routes.append((name, handler, subject))
+    return routes[:MAX_INTENTS]
+
+@intent("plot", "what is the plot of", "what's the plot of", "plot of", "summary of")
+def _plot_intent(subject: str, context=None) -> str:
+    return get_book_info(subject)
+
+@intent("define", "what is the meaning of", "what's the meaning of", "meaning of", "define", "what is", "what's")
+def _define_intent(subject: str, context=None) -> str:
+    word = re.match(r"[\w\s-]+", subject)
+    if not word or not word.group(0).strip():
+        return f"Sorry, I couldn't tell which word you meant in '{subject}'."
+    return get_definition(word.group(0).strip().lower())
+
+@intent("similar", "books like", "books similar to", "something like", "similar to")
+def _similar_intent(subject: str, context=None) -> str:
+    """
+    Answers from the local similarity data only, so it never waits on the network. The ranking
+    comes in through `context["similar_books"]`, a `(title, top_n) -> [book ids]` callable.
+    """
+    similar_books = (context or {}).get("similar_books")
+    if similar_books is None:
+        return "Sorry, the local book data I use for recommendations isn't available right now."
+    book_ids = similar_books(subject, top_n=5)
+    if not book_ids:
+        return f"Sorry, I couldn't find '{subject}' in the library to compare against."
+    lines = [f"**Books like {subject}:**"]
+    for book_id in book_ids:
+        book = get_book(book_id, fetch_details=False)
+        lines.append(f"- **{book['title']}** by {book.get('authors') or 'Unknown'}")
+    return "\n".join(lines)
+
+HELP_TEXT = (
+    "I can help with a few things:\n\n"
+    "1.  **Definitions:** Try asking `What is melancholy?`\n"
+    "2.  **Book Plots:** Try asking `Plot of The Great Gatsby`\n"
+    "3.  **Recommendations:** Try asking `Books like The Hobbit`\n\n"
+    "You can ask for several at once, e.g. `Define ephemeral and plot of 1984`. How can I assist you?"
+)
+
+def stream_answer(prompt: str, context: dict | None = None):
+    """
+    Yields one markdown part per intent in the message, each as soon as its handler finishes.
+    Handlers run concurrently on a pool owned by this reply; any still running after REPLY_TIME_BUDGET
+    seconds get an apology instead (their HTTP timeouts let them finish shortly after, off the pool).
+    `context` holds local resources for handlers that need them (`similar_books`).
+    """
+    routes = route(prompt.strip())
+    if not routes:
+        yield HELP_TEXT
+        return
+
+    executor = ThreadPoolExecutor(max_workers=len(routes))
+    futures = {executor.submit(handler, subject, context): subject for _, handler, subject in routes}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=REPLY_TIME_BUDGET):
+            pending.discard(future)
+            yield _reply_part(future, futures[future])
+    except TimeoutError:
+        for future in pending:
+            if future.done():
+                yield _reply_part(future, futures[future])
+            else:
+                yield f"Sorry, looking up '{futures[future]}' is taking too long. Please try again in a moment."
+    finally:
+        executor.shutdown(wait=False)
+
+def _reply_part(future, subject: str) -> str:
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Chatbot handler error for '{subject}': {e}")
+        return f"An unexpected error occurred while answering about '{subject}'."
+
+def answer(prompt: str, context: dict | None = None) -> str:
+    """Returns the full reply to a message, with one section per intent it contains."""
+    return PART_SEPARATOR.join(stream_answer(prompt, context))
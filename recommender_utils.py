@@ -2,67 +2,135 @@
 
 import requests
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from difflib import get_close_matches
-import streamlit as st # Import Streamlit for caching
+from backend.book_ids import get_book, resolve_title, resolve_volume, book_id_for_row
+
+GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+TIMEOUT = 30
 
 # --- API-based functions ---
 
-@st.cache_data(ttl="6h") # Cache API results for 6 hours
+def get_book_details(book_id: str) -> dict | None:
+    """
+    Returns display details (like a working image URL) for a canonical book id. Not cached here:
+    the book store keeps fetched details and retries records whose fetch failed.
+    """
+    book = get_book(book_id)
+    if book is None: return None
+    return {
+        "Book-Id": book_id,
+        "Book-Title": book.get("title"),
+        "Book-Author": book.get("authors") or "N/A",
+        "Published-Year": book.get("published_year") or "N/A",
+        "Image-URL": book.get("thumbnail")
+    }
+
 def fetch_book_details_from_api(book_title: str) -> dict | None:
     """
-    **NEW**: Fetches fresh details (like a working image URL) for a single book title.
+    Fetches fresh details for a single book title, resolving it to its canonical id first
+    so every spelling of the same book shares one lookup.
+    """
+    book_id = resolve_title(book_title)
+    return get_book_details(book_id) if book_id else None
+
+FILTER_PAGE_SIZE = 40   # Google Books' maximum maxResults
+FILTER_MAX_PAGES = 6
+FILTER_WORKERS = 3
+
+def _fetch_filter_page(query: str, start_index: int):
+    """Returns one page of search results and Google's estimate of the total number of matches."""
+    params = {"q": query, "maxResults": FILTER_PAGE_SIZE, "startIndex": start_index, "printType": "books"}
+    response = requests.get(GOOGLE_BOOKS_API_URL, params=params, timeout=TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    return data.get("items", []), data.get("totalItems", 0)
+
+def _filter_pages(query: str, max_pages: int):
+    """
+    Yields result pages in relevance order. The first page is fetched on its own; the rest are only
+    requested (concurrently) if the caller keeps reading, and stop at an empty page or `totalItems`.
     """
-    base_url = "https://www.googleapis.com/books/v1/volumes"
-    params = {"q": f'intitle:"{book_title}"', "maxResults": 1, "printType": "books", "langRestrict": "en"}
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if "items" in data:
-            info = data["items"][0].get("volumeInfo", {})
-            return {
-                "Book-Title": info.get("title", book_title),
-                "Book-Author": ", ".join(info.get("authors", ["N/A"])),
-                "Published-Year": info.get("publishedDate", "N/A")[:4],
-                "Image-URL": info.get("imageLinks", {}).get("thumbnail")
-            }
-    except Exception as e:
-        print(f"API request failed for '{book_title}': {e}")
-    return None
+        items, total_items = _fetch_filter_page(query, 0)
+    except requests.exceptions.RequestException as e:
+        print(f"API request failed: {e}")
+        return
+    if not items: return
+    yield items
 
-def recommend_books_by_filter_api(genre=None, author=None, year_range=None, top_n=5):
-    """Finds books using the Google Books API. (This function is already API-based and works well)."""
-    base_url = "https://www.googleapis.com/books/v1/volumes"
+    start_indexes = iter(range(FILTER_PAGE_SIZE, min(total_items, max_pages * FILTER_PAGE_SIZE), FILTER_PAGE_SIZE))
+    executor = ThreadPoolExecutor(max_workers=FILTER_WORKERS)
+    try:
+        # At most FILTER_WORKERS pages are in flight; the next is only requested once one is consumed,
+        # so closing this generator stops further requests
+        in_flight = deque(executor.submit(_fetch_filter_page, query, start) for start in islice(start_indexes, FILTER_WORKERS))
+        page_number = 1
+        while in_flight:
+            page = in_flight.popleft()
+            page_number += 1
+            try:
+                items, _ = page.result()
+            except requests.exceptions.RequestException as e:
+                print(f"API request failed (page {page_number}): {e}")
+                items = None
+            if items == []: return   # Past the last page
+            if items:
+                yield items
+            next_start = next(start_indexes, None)
+            if next_start is not None:
+                in_flight.append(executor.submit(_fetch_filter_page, query, next_start))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _filter_result(item: dict, year_range=None) -> dict | None:
+    """Turns one API item into a result row, or None if it's outside the year range or lacks a cover."""
+    info = item.get("volumeInfo", {})
+    published_date = info.get("publishedDate", "0")
+    try:
+        year = int(published_date[:4])
+    except (ValueError, TypeError):
+        return None
+    if year_range and not (year_range[0] <= year <= year_range[1]):
+        return None
+    if not all(k in info for k in ["title", "authors", "imageLinks"]):
+        return None
+    return {
+        "Book-Id": resolve_volume(item),
+        "Book-Title": info.get("title"), "Book-Author": ", ".join(info.get("authors", ["N/A"])),
+        "Published-Year": year, "Image-URL": info.get("imageLinks", {}).get("thumbnail"),
+    }
+
+def stream_books_by_filter_api(genre=None, author=None, year_range=None, top_n=5, max_pages=FILTER_MAX_PAGES):
+    """
+    Yields books matching the filters one at a time, as soon as they are found.
+    Further result pages (`startIndex`) are only fetched when the first doesn't yield `top_n`
+    distinct books; the search stops as soon as it has `top_n` or the results run out.
+    """
     query_parts = []
     if author: query_parts.append(f"inauthor:{author.strip()}")
     if genre: query_parts.append(f"subject:{genre.strip()}")
     if not query_parts: query_parts.append("subject:fiction")
     query = "+".join(query_parts)
-    params = {"q": query, "maxResults": 40, "printType": "books"}
+
+    pages = _filter_pages(query, max_pages)
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        books = []
-        if "items" in data:
-            for item in data.get("items", []):
-                info = item.get("volumeInfo", {})
-                published_date = info.get("publishedDate", "0")
-                try:
-                    year = int(published_date[:4])
-                    if year_range and not (year_range[0] <= year <= year_range[1]):
-                        continue
-                except (ValueError, TypeError):
-                    continue
-                if all(k in info for k in ["title", "authors", "imageLinks"]):
-                    books.append({
-                        "Book-Title": info.get("title"), "Book-Author": ", ".join(info.get("authors", ["N/A"])),
-                        "Published-Year": year, "Image-URL": info.get("imageLinks", {}).get("thumbnail"),
-                    })
-        return pd.DataFrame(books).drop_duplicates(subset="Book-Title").head(top_n)
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed: {e}")
-        return pd.DataFrame()
+        seen_ids = set()
+        for items in pages:
+            for item in items:
+                book = _filter_result(item, year_range)
+                if book is None or book["Book-Id"] in seen_ids: continue
+                seen_ids.add(book["Book-Id"])
+                yield book
+                if len(seen_ids) >= top_n: return
+    finally:
+        pages.close()
+
+def recommend_books_by_filter_api(genre=None, author=None, year_range=None, top_n=5):
+    """Finds books using the Google Books API, paging through results until `top_n` are found."""
+    return pd.DataFrame(list(stream_books_by_filter_api(genre=genre, author=author, year_range=year_range, top_n=top_n)))
 
 # --- Local data-based functions (now enriched with API calls) ---
 
@@ -75,25 +143,37 @@ def get_best_book_match(query_title: str, candidate_titles: list, cutoff: float
             return title
     return None
 
-def recommend_similar_books_local(input_title, df_meta, cosine_sim, indices, top_n=5):
-    """
-    **MODIFIED**: Finds similar book titles locally, then fetches their details from the API.
-    """
-    if not input_title: return pd.DataFrame()
+def similar_book_ids(input_title, df_meta, cosine_sim, indices, top_n=5) -> list:
+    """Ranks books similar to `input_title` using only the local similarity data, as canonical ids."""
+    if not input_title: return []
     
     unique_titles = df_meta['Book-Title'].unique()
     matched_title = get_best_book_match(input_title, list(unique_titles))
-    if not matched_title: return pd.DataFrame()
+    if not matched_title: return []
 
     idx = indices[matched_title].iloc[0] if isinstance(indices[matched_title], pd.Series) else indices[matched_title]
     sim_scores = sorted(list(enumerate(cosine_sim[idx])), key=lambda x: x[1], reverse=True)
     sim_scores = sim_scores[1:top_n+10]
     book_indices = [i[0] for i in sim_scores]
     
-    recommended_books = df_meta.iloc[book_indices].drop_duplicates(subset=['Book-Title']).head(top_n)
+    # Map rows to canonical ids (by ISBN where available) so editions of the same book collapse
+    matched_id = book_id_for_row(df_meta.iloc[idx])
+    book_ids = []
+    for row in df_meta.iloc[book_indices].to_dict("records"):
+        book_id = book_id_for_row(row)
+        if book_id and book_id != matched_id and book_id not in book_ids:
+            book_ids.append(book_id)
+
+    return book_ids[:top_n]
+
+def recommend_similar_books_local(input_title, df_meta, cosine_sim, indices, top_n=5):
+    """
+    **MODIFIED**: Finds similar book titles locally, then fetches their details from the API.
+    """
+    book_ids = similar_book_ids(input_title, df_meta, cosine_sim, indices, top_n=top_n)
 
     # **NEW**: Fetch fresh details for each recommended book to get working images
-    fresh_details = [fetch_book_details_from_api(title) for title in recommended_books['Book-Title']]
+    fresh_details = [get_book_details(book_id) for book_id in book_ids]
     return pd.DataFrame([details for details in fresh_details if details is not None])
 
 def get_trending_books(genre: str, df_meta: pd.DataFrame, final_ratings: pd.DataFrame, top_n: int = 3):
@@ -110,16 +190,19 @@ def get_trending_books(genre: str, df_meta: pd.DataFrame, final_ratings: pd.Data
 
     rating_summary = rated_books.groupby('Book-Title').agg(avg_rating=('Book-Rating', 'mean'), num_ratings=('Book-Rating', 'count')).reset_index()
     
-    top_books_df = rating_summary[rating_summary['num_ratings'] >= 20].sort_values(by='avg_rating', ascending=False).head(top_n)
+    # Look at a few extra candidates, since title variants of one book resolve to the same id
+    top_books_df = rating_summary[rating_summary['num_ratings'] >= 20].sort_values(by='avg_rating', ascending=False).head(top_n * 2)
     if top_books_df.empty: return pd.DataFrame()
 
     # **NEW**: Fetch fresh details for each trending book
-    fresh_details = []
+    fresh_details, seen_ids = [], set()
     for _, row in top_books_df.iterrows():
         details = fetch_book_details_from_api(row['Book-Title'])
-        if details:
+        if details and details['Book-Id'] not in seen_ids:
+            seen_ids.add(details['Book-Id'])
             details['avg_rating'] = row['avg_rating']
             details['num_ratings'] = row['num_ratings']
             fresh_details.append(details)
+            if len(fresh_details) == top_n: break
             
-    return pd.DataFrame(fresh_details)
\ No newline at end of file
+    return pd.DataFrame(fresh_details)
@@ -0,0 +1,40 @@
+# ui_utils.py
+
+import math
+import streamlit as st
+
+def _set_page(page_key: str, page: int):
+    st.session_state[page_key] = page
+
+def reset_grid(key: str):
+    """Sends the grid stored under `key` back to its first page (call after new results are computed)."""
+    st.session_state[f"{key}_page"] = 0
+
+def render_grid(items: list, render_item, n_cols: int = 3):
+    """Lays `items` out in rows of `n_cols` columns, calling `render_item` for each."""
+    for row_start in range(0, len(items), n_cols):
+        cols = st.columns(n_cols)
+        for col, item in zip(cols, items[row_start:row_start + n_cols]):
+            with col:
+                render_item(item)
+
+def render_paginated_grid(items: list, key: str, render_item, per_page: int = 6, n_cols: int = 3):
+    """
+    Renders `items` in a grid of `n_cols` columns, `per_page` items at a time.
+    The current page is kept in session state under `{key}_page`, so paging only
+    re-lays out this grid (call it from inside an `st.fragment`).
+    """
+    if not items: return
+    page_key = f"{key}_page"
+    num_pages = max(1, math.ceil(len(items) / per_page))
+    page = min(st.session_state.get(page_key, 0), num_pages - 1)
+
+    render_grid(items[page * per_page:(page + 1) * per_page], render_item, n_cols)
+
+    if num_pages > 1:
+        prev_col, info_col, next_col = st.columns([1, 2, 1])
+        prev_col.button("◀ Previous", key=f"{key}_prev", disabled=page == 0, use_container_width=True,
+                        on_click=_set_page, args=(page_key, page - 1))
+        info_col.markdown(f"<p style='text-align:center;'>Page {page + 1} of {num_pages}</p>", unsafe_allow_html=True)
+        next_col.button("Next ▶", key=f"{key}_next", disabled=page >= num_pages - 1, use_container_width=True,
+                        on_click=_set_page, args=(page_key, page + 1))